@@ -14,102 +14,228 @@ Usage:
     python3 code_churn_measurement.py --repo /path/to/git/repo --out churn_results.json
 
 Dependencies:
-    pip install matplotlib
+    pip install matplotlib pandas
+    pip install orjson  # optional, faster JSON output
+    pip install numba   # optional, compiled churn aggregation
 """
 
 import argparse
+import functools
+import heapq
 import subprocess
+import tempfile
 import json
-from collections import defaultdict
-from pathlib import Path
+import queue
+import re
+import threading
+import matplotlib
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
 
 # -------------------------
 # Helper functions
 # -------------------------
 
-def run_git_log(repo_path):
+def run_git_log(repo_path, chunk_size=65536, queue_size=4):
     """
-    Runs git log to get numstat (lines added/removed per commit per file)
+    Runs git log to get numstat (lines added/removed per commit per file).
+    Yields raw byte chunks of NUL-delimited records as git produces them
+    instead of buffering the whole log. Rename detection and merge commits
+    are skipped, which spares git the similarity computation; as a result
+    a renamed file counts as a full delete of the old path plus a full add
+    of the new one.
+
+    A reader thread drains git's stdout into a bounded queue so that
+    reading the pipe overlaps with parsing and aggregation in the caller.
     """
-    cmd = ['git', '-C', str(repo_path), 'log', '--numstat', '--pretty=format:commit %H']
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(f"Git command failed: {result.stderr}")
-    return result.stdout.splitlines()
+    cmd = ['git', '-C', str(repo_path), 'log', '--numstat', '--no-renames',
+           '--no-merges', '-z', '--format=']
+    # stderr goes to a temporary file so git can never block on a full
+    # stderr pipe while we are only draining stdout
+    stderr_file = tempfile.TemporaryFile()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file)
+    chunks = queue.Queue(maxsize=queue_size)
+
+    def read_stdout():
+        try:
+            for chunk in iter(lambda: proc.stdout.read(chunk_size), b''):
+                chunks.put(chunk)
+        finally:
+            chunks.put(b'')  # end-of-stream marker
 
-def parse_git_numstat(lines):
+    reader = threading.Thread(target=read_stdout, daemon=True)
+    reader.start()
+    finished = False
+    try:
+        yield from iter(chunks.get, b'')
+        finished = True
+    finally:
+        if not finished:
+            # The consumer stopped early: stop git and unblock the reader
+            proc.kill()
+            while chunks.get():
+                pass
+        reader.join()
+        proc.stdout.close()
+        returncode = proc.wait()
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode(errors='replace')
+        stderr_file.close()
+        if returncode != 0 and finished:
+            raise RuntimeError(f"Git command failed: {stderr}")
+
+# One numstat record: "added<TAB>removed<TAB>path<NUL>". Binary files report
+# '-' for added/removed and simply do not match. Records are anchored to the
+# start of the buffer or a preceding NUL so a match can never begin inside a
+# path.
+NUMSTAT_RECORD = re.compile(rb'(?:^|(?<=\0))(\d+)\t(\d+)\t([^\0]*)\0')
+
+def parse_git_numstat(chunks):
     """
-    Parses git log --numstat output and returns a list of (added, removed, file_path)
+    Parses byte chunks of git log -z --numstat --format= output and yields
+    (added, removed, file_path) tuples
     """
-    file_churn = []
-    for line in lines:
-        line = line.strip()
-        if not line or line.startswith('commit'):
-            continue
-        parts = line.split('\t')
-        if len(parts) != 3:
-            continue
-        added, removed, file_path = parts
-        # Sometimes added/removed is '-' for binary files
-        try:
-            added = int(added)
-            removed = int(removed)
-            file_churn.append((added, removed, file_path))
-        except ValueError:
-            continue
-    return file_churn
+    pending = b''
+    for chunk in chunks:
+        buffer = pending + chunk
+        # Only scan complete records; carry the partial tail to the next chunk
+        end = buffer.rfind(b'\0') + 1
+        pending = buffer[end:]
+        for m in NUMSTAT_RECORD.finditer(buffer, 0, end):
+            # -z emits raw path bytes; keep non-UTF-8 names distinct and
+            # JSON-safe (orjson rejects lone surrogates) instead of failing
+            yield int(m[1]), int(m[2]), m[3].decode(errors='backslashreplace')
+
+# Below this many numstat rows NumPy is fast enough that importing numba
+# and compiling the kernel would cost more than it saves
+NUMBA_MIN_ROWS = 1_000_000
+
+def _accumulate_churn_loop(added, removed, file_ids, module_ids, n_files, n_modules):
+    """
+    Integer accumulation loop; only run compiled via _numba_accumulate()
+    """
+    file_added = np.zeros(n_files, dtype=np.int64)
+    file_removed = np.zeros(n_files, dtype=np.int64)
+    module_added = np.zeros(n_modules, dtype=np.int64)
+    module_removed = np.zeros(n_modules, dtype=np.int64)
+    for i in range(len(added)):
+        file_added[file_ids[i]] += added[i]
+        file_removed[file_ids[i]] += removed[i]
+        module_added[module_ids[i]] += added[i]
+        module_removed[module_ids[i]] += removed[i]
+    return file_added, file_removed, module_added, module_removed
+
+@functools.lru_cache(maxsize=None)
+def _numba_accumulate():
+    """
+    Imports numba and JIT-compiles the accumulation loop on first use;
+    returns None when numba is not installed
+    """
+    try:
+        from numba import njit
+    except ImportError:  # numba is optional; fall back to NumPy bincount
+        return None
+    return njit(cache=True)(_accumulate_churn_loop)
+
+def _accumulate_churn(added, removed, file_ids, module_ids, n_files, n_modules):
+    """
+    Sums added/removed lines per file id and per module id; returns four
+    int64 arrays (file_added, file_removed, module_added, module_removed).
+    Inputs of at least NUMBA_MIN_ROWS rows use the numba kernel when numba
+    is installed. Otherwise np.bincount is used, which accumulates in
+    float64 (exact for totals below 2**53) before casting back to int64.
+    """
+    if len(added) >= NUMBA_MIN_ROWS:
+        kernel = _numba_accumulate()
+        if kernel is not None:
+            return kernel(added, removed, file_ids, module_ids, n_files, n_modules)
+    return (
+        np.bincount(file_ids, added, n_files).astype(np.int64),
+        np.bincount(file_ids, removed, n_files).astype(np.int64),
+        np.bincount(module_ids, added, n_modules).astype(np.int64),
+        np.bincount(module_ids, removed, n_modules).astype(np.int64),
+    )
 
 def aggregate_churn(file_churn):
     """
-    Aggregates churn per file and per module
-    """
-    file_metrics = defaultdict(lambda: {'added': 0, 'removed': 0})
-    module_metrics = defaultdict(lambda: {'added': 0, 'removed': 0})
-    
-    for added, removed, path in file_churn:
-        file_metrics[path]['added'] += added
-        file_metrics[path]['removed'] += removed
-        module = Path(path).parent.as_posix() if Path(path).parent != Path('.') else '.'
-        module_metrics[module]['added'] += added
-        module_metrics[module]['removed'] += removed
-    
-    # Compute total churn
-    for metrics in file_metrics.values():
-        metrics['total_churn'] = metrics['added'] + metrics['removed']
-    for metrics in module_metrics.values():
-        metrics['total_churn'] = metrics['added'] + metrics['removed']
-    
-    return file_metrics, module_metrics
-
-def save_json(file_metrics, module_metrics, out_path):
+    Aggregates churn per file and per module from an iterable of
+    (added, removed, file_path) tuples
+    """
+    df = pd.DataFrame.from_records(file_churn, columns=['added', 'removed', 'path'])
+    if df.empty:
+        return {}, {}
+    # git paths are always '/'-separated; top-level files belong to '.'
+    modules = df['path'].str.rpartition('/')[0].replace('', '.')
+
+    # Intern paths and modules to dense integer ids (in first-seen order)
+    # so the accumulation runs over plain arrays
+    file_ids, files = pd.factorize(df['path'])
+    module_ids, module_names = pd.factorize(modules)
+    file_added, file_removed, module_added, module_removed = _accumulate_churn(
+        df['added'].to_numpy(np.int64), df['removed'].to_numpy(np.int64),
+        file_ids, module_ids, len(files), len(module_names))
+
+    return (_churn_dict(files, file_added, file_removed),
+            _churn_dict(module_names, module_added, module_removed))
+
+def _churn_dict(names, added, removed):
+    """
+    Builds {name: {'added', 'removed', 'total_churn'}} from parallel arrays
+    """
+    # total_churn is derived while building the dicts, in the same pass;
+    # tolist() hands back native ints so no per-value conversion is needed
+    return {
+        name: {'added': a, 'removed': r, 'total_churn': a + r}
+        for name, a, r in zip(names, added.tolist(), removed.tolist())
+    }
+
+def save_json(file_metrics, module_metrics, out_path, pretty=False):
+    """
+    Writes compact JSON by default; pretty=True indents it for reading
+    """
     results = {
         'files': file_metrics,
         'modules': module_metrics
     }
-    with open(out_path, 'w') as f:
-        json.dump(results, f, indent=2)
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        with open(out_path, 'wb') as f:
+            f.write(orjson.dumps(results, option=option))
+    else:
+        with open(out_path, 'w') as f:
+            if pretty:
+                json.dump(results, f, indent=2)
+            else:
+                json.dump(results, f, separators=(',', ':'))
 
-def plot_top_files(file_metrics, top_n=10, save_path=None):
-    sorted_files = sorted(file_metrics.items(), key=lambda x: x[1]['total_churn'], reverse=True)[:top_n]
+def plot_top_files(file_metrics, top_n=10, save_path=None, show=False):
+    sorted_files = heapq.nlargest(top_n, file_metrics.items(), key=lambda x: x[1]['total_churn'])
     files = [f[0] for f in sorted_files]
     churn_values = [f[1]['total_churn'] for f in sorted_files]
 
-    plt.figure(figsize=(10,6))
+    fig = plt.figure(figsize=(10,6))
     plt.barh(files[::-1], churn_values[::-1], color='skyblue')
     plt.xlabel('Total Churn (lines added + removed)')
     plt.title(f'Top {top_n} Files by Code Churn')
     plt.tight_layout()
     if save_path:
         plt.savefig(save_path)
-    plt.show()
+    if show:
+        plt.show()
+    plt.close(fig)
 
-def plot_modules(module_metrics, save_path=None):
-    sorted_modules = sorted(module_metrics.items(), key=lambda x: x[1]['total_churn'], reverse=True)
-    modules = [m[0] for m in sorted_modules]
-    churn_values = [m[1]['total_churn'] for m in sorted_modules]
+def plot_modules(module_metrics, save_path=None, show=False):
+    module_churn = {module: metrics['total_churn'] for module, metrics in module_metrics.items()}
+    modules = sorted(module_churn, key=module_churn.__getitem__, reverse=True)
+    churn_values = [module_churn[m] for m in modules]
 
-    plt.figure(figsize=(12,6))
+    fig = plt.figure(figsize=(12,6))
     plt.bar(modules, churn_values, color='salmon')
     plt.xticks(rotation=90)
     plt.ylabel('Total Churn (lines added + removed)')
@@ -117,7 +243,9 @@ def plot_modules(module_metrics, save_path=None):
     plt.tight_layout()
     if save_path:
         plt.savefig(save_path)
-    plt.show()
+    if show:
+        plt.show()
+    plt.close(fig)
 
 # -------------------------
 # Main
@@ -126,22 +254,28 @@ def main():
     parser = argparse.ArgumentParser(description="Code Churn Measurement Instrument")
     parser.add_argument("--repo", required=True, help="Path to local Git repository")
     parser.add_argument("--out", required=True, help="Output JSON file path")
+    parser.add_argument("--pretty", action="store_true", help="Indent the JSON output")
+    parser.add_argument("--show", action=argparse.BooleanOptionalAction, default=False,
+                        help="Display the charts interactively after saving them")
     args = parser.parse_args()
 
+    if not args.show:
+        # Headless: render straight to files without starting a GUI backend
+        matplotlib.use('Agg')
+
     print(f"Running git log on {args.repo} ...")
-    lines = run_git_log(args.repo)
-    print(f"Parsing {len(lines)} lines of git log ...")
-    file_churn_list = parse_git_numstat(lines)
-    print(f"Found {len(file_churn_list)} file entries with churn ...")
-    file_metrics, module_metrics = aggregate_churn(file_churn_list)
-    save_json(file_metrics, module_metrics, args.out)
+    chunks = run_git_log(args.repo)
+    file_churn = parse_git_numstat(chunks)
+    file_metrics, module_metrics = aggregate_churn(file_churn)
+    print(f"Found {len(file_metrics)} files with churn ...")
+    save_json(file_metrics, module_metrics, args.out, pretty=args.pretty)
     print(f"Results saved to {args.out}")
 
     print("Plotting top files by churn ...")
-    plot_top_files(file_metrics, top_n=10, save_path="top_files_churn.png")
+    plot_top_files(file_metrics, top_n=10, save_path="top_files_churn.png", show=args.show)
 
     print("Plotting churn per module ...")
-    plot_modules(module_metrics, save_path="module_churn.png")
+    plot_modules(module_metrics, save_path="module_churn.png", show=args.show)
 
 if __name__ == "__main__":
     main()
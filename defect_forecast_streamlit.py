@@ -1,9 +1,93 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import io
 import json
+from pathlib import Path
 import matplotlib.pyplot as plt
 
+# ----------------------------
+# Cached loaders and forecast
+# ----------------------------
+# Streamlit reruns the whole script on every widget change; these caches
+# keep CSV parsing, config loading and the forecast math off that path
+# unless their inputs actually change.
+@st.cache_data
+def load_csv(csv_bytes):
+    """
+    Parse CSV content given as raw bytes, detect its defect and week
+    columns, and parse week_start to datetimes. Raises ValueError if
+    either column is missing. Keyed on the bytes, so edits to the file
+    invalidate the cache.
+    """
+    df = pd.read_csv(io.BytesIO(csv_bytes))
+
+    # Detect defect column automatically
+    possible_cols = [c for c in df.columns if "defect" in c.lower()]
+    if not possible_cols:
+        raise ValueError("❌ Could not find a column with defect counts. Please check your CSV.")
+    df.rename(columns={possible_cols[0]: "defects_reported"}, inplace=True)
+
+    # Detect week column automatically
+    possible_weeks = [c for c in df.columns if "week" in c.lower()]
+    if not possible_weeks:
+        raise ValueError("❌ Could not find a column with week start dates. Please check your CSV.")
+    df.rename(columns={possible_weeks[0]: "week_start"}, inplace=True)
+    df["week_start"] = pd.to_datetime(df["week_start"])
+    return df
+
+@st.cache_resource
+def load_config(path="config.json"):
+    with open(path) as f:
+        return json.load(f)
+
+@st.cache_data
+def compute_forecast(y_bytes, method, window, horizon, alpha):
+    """Forecast `horizon` weeks from float64 history bytes; returns a float ndarray."""
+    y = np.frombuffer(y_bytes, dtype=np.float64)
+    # Every branch produces a float ndarray of shape (horizon,)
+    if method == "naive":
+        forecast = np.full(horizon, y[-1], dtype=np.float64)
+
+    elif method == "moving_average":
+        # Rolling moving average over history plus a preallocated tail:
+        # keep a running sum of data[start:k] and feed each forecast back
+        # in for the next step
+        n = len(y)
+        data = np.empty(n + horizon)
+        data[:n] = y
+        start = max(n - window, 0)
+        running_sum = data[start:n].sum()
+        for k in range(n, n + horizon):
+            ma = running_sum / (k - start)
+            data[k] = ma
+            if k - start == window:
+                running_sum -= data[start]
+                start += 1
+            running_sum += ma
+        forecast = data[n:]
+
+    elif method == "ewma":
+        # Exponentially weighted moving average. Unrolling
+        # s_t = alpha*y_t + (1-alpha)*s_{t-1} with s_0 = y_0 gives
+        # s_n = (1-alpha)^n * y_0 + alpha * sum_{i=1..n} (1-alpha)^(n-i) * y_i,
+        # i.e. a single dot product. Feeding s back into the recurrence
+        # leaves it unchanged, so the forecast is flat at that level.
+        decay = 1 - alpha
+        weights = decay ** np.arange(len(y) - 1, -1, -1)
+        s = weights[0] * y[0] + alpha * np.dot(weights[1:], y[1:])
+        forecast = np.full(horizon, s)
+
+    elif method == "linear":
+        x = np.arange(len(y))
+        coef = np.polyfit(x, y, 1)
+        forecast = np.polyval(coef, np.arange(len(y), len(y)+horizon))
+
+    else:
+        raise ValueError(f"unknown method {method!r}")
+
+    return forecast
+
 st.title("Defect Inflow Measurement and Forecasting System")
 
 # ----------------------------
@@ -11,84 +95,46 @@ st.title("Defect Inflow Measurement and Forecasting System")
 # ----------------------------
 uploaded_file = st.file_uploader("Upload weekly defect data CSV", type=["csv"])
 
-if uploaded_file:
-    df = pd.read_csv(uploaded_file)
-else:
-    df = pd.read_csv("defect_inflow_data.csv")
-
-# ----------------------------
-# Detect defect column automatically
-# ----------------------------
-possible_cols = [c for c in df.columns if "defect" in c.lower()]
-if not possible_cols:
-    st.error("❌ Could not find a column with defect counts. Please check your CSV.")
+# Column detection and date parsing happen inside the cached loader
+try:
+    if uploaded_file:
+        df = load_csv(uploaded_file.getvalue())
+    else:
+        df = load_csv(Path("defect_inflow_data.csv").read_bytes())
+except ValueError as e:
+    st.error(str(e))
     st.stop()
-df.rename(columns={possible_cols[0]: "defects_reported"}, inplace=True)
-
-# Detect week column automatically
-possible_weeks = [c for c in df.columns if "week" in c.lower()]
-if not possible_weeks:
-    st.error("❌ Could not find a column with week start dates. Please check your CSV.")
-    st.stop()
-df.rename(columns={possible_weeks[0]: "week_start"}, inplace=True)
 
 st.write("### Raw Data", df.head())
 
 # ----------------------------
 # Load configuration
 # ----------------------------
-with open("config.json") as f:
-    config = json.load(f)
+config = load_config()
 
 method = st.selectbox("Forecasting Method", ["naive", "moving_average", "ewma", "linear"], index=1)
 window = st.slider("Window Size (for MA/EWMA)", 2, 10, config.get("window_size", 3))
 horizon = st.slider("Forecast Weeks Ahead", 1, 6, config.get("forecast_weeks", 4))
 alpha = st.slider("EWMA alpha", 0.1, 0.9, config.get("alpha", 0.3))
 
-y = df["defects_reported"].values
+y = df["defects_reported"].to_numpy(dtype=np.float64)
 
 # ----------------------------
 # Forecast logic
 # ----------------------------
-forecast = []
-
-if method == "naive":
-    forecast = [y[-1]] * horizon
-
-elif method == "moving_average":
-    # Compute rolling moving average for each forecast step
-    data = list(y)
-    for _ in range(horizon):
-        ma = np.mean(data[-window:]) if len(data) >= window else np.mean(data)
-        forecast.append(ma)
-        data.append(ma)  # update for next step
-
-elif method == "ewma":
-    # Exponentially weighted moving average
-    data = list(y)
-    for _ in range(horizon):
-        s = data[0]
-        for val in data[1:]:
-            s = alpha * val + (1 - alpha) * s
-        forecast.append(s)
-        data.append(s)  # update for next step
-
-elif method == "linear":
-    x = np.arange(len(y))
-    coef = np.polyfit(x, y, 1)
-    forecast = list(np.polyval(coef, np.arange(len(y), len(y)+horizon)))
+forecast = compute_forecast(y.tobytes(), method, window, horizon, alpha)
 
 # ----------------------------
 # Prepare forecast dataframe
 # ----------------------------
 future_weeks = pd.date_range(
-    start=pd.to_datetime(df["week_start"]).iloc[-1] + pd.Timedelta(weeks=1),
+    start=df["week_start"].iloc[-1] + pd.Timedelta(weeks=1),
     periods=horizon,
     freq="W"
 )
 forecast_df = pd.DataFrame({
-    "week_start": future_weeks.strftime("%Y-%m-%d"),
-    "forecast_defects": np.round(forecast).astype(int)
+    "week_start": future_weeks,
+    "forecast_defects": forecast.round().astype(int)
 })
 
 st.write("### Forecast", forecast_df)